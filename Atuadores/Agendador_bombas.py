@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Agendamento das bombas de várias zonas que dividem a mesma linha/tanque.
+
+Cada zona chega com a lâmina calculada (mm), a área e a vazão da sua
+bomba. O agendador encaixa as irrigações no tempo de forma que:
+  - a soma das vazões das bombas ligadas ao mesmo tempo não passe da
+    vazão máxima da linha (L/h);
+  - o volume total não passe do volume disponível no tanque (L); zonas
+    que não cabem ficam adiadas para o próximo ciclo;
+  - com janelas fora de pico configuradas, só rodem as zonas que
+    terminam dentro da janela atual. Fora da janela nada roda e as zonas
+    ficam adiadas: o agendador não espera, quem decide o horário é o cron
+    que chama main.py (agendado para dentro da janela).
+  - duas zonas no mesmo Arduino ('porta') nunca rodam ao mesmo tempo:
+    abrir a serial reinicia a placa e o Arduino bloqueia durante a rega.
+
+Zonas independentes rodam em paralelo sempre que a vazão permite, o que
+minimiza o tempo total de irrigação (escalonamento guloso, maior duração
+primeiro).
+"""
+
+import datetime
+import math
+import threading
+import time
+
+
+def duracao_bomba_s(quantidade_mm, area_m2, vazao_lph):
+    """Mesmo cálculo de acionar_bomba_irrigacao: 1 mm = 1 L/m²."""
+    litros = quantidade_mm * area_m2
+    if quantidade_mm <= 0 or vazao_lph <= 0:
+        return litros, 0
+    return litros, math.ceil(litros * 3600 / vazao_lph)
+
+
+def fim_janela_atual(agora, janelas):
+    """
+    Se agora está dentro de uma das janelas (hora_inicio, hora_fim), em
+    horas inteiras, retorna o datetime em que essa janela termina (a mais
+    longa, se houver sobreposição); fora de todas, retorna None. Janelas
+    podem cruzar a meia-noite, ex.: (21, 6).
+    """
+    meia_noite = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+    hora = agora.hour
+    fins = []
+    for hora_inicio, hora_fim in janelas:
+        if hora_inicio < hora_fim:
+            if hora_inicio <= hora < hora_fim:
+                fins.append(meia_noite + datetime.timedelta(hours=hora_fim))
+        elif hora >= hora_inicio:
+            fins.append(meia_noite + datetime.timedelta(days=1, hours=hora_fim))
+        elif hora < hora_fim:
+            fins.append(meia_noite + datetime.timedelta(hours=hora_fim))
+    return max(fins) if fins else None
+
+
+def agendar_irrigacao(zonas, vazao_max_lph, volume_tanque_l=None,
+                      janelas_fora_pico=None, agora=None, folga_s=5):
+    """
+    Monta o plano de irrigação.
+
+    zonas: lista de dicts com 'nome', 'quantidade_mm', 'area_m2' e
+    'vazao_lph' (outras chaves, como 'porta', são mantidas no plano).
+
+    Retorna um dict com:
+      'inicio':   datetime do início do plano (agora)
+      'execucoes': lista de zonas com 'litros', 'duracao_s', 'inicio_s' e 'fim_s'
+                   (segundos a partir do início), ordenada por inicio_s
+      'adiadas':  zonas que não couberam (vazão, tanque ou janela), com 'motivo'
+      'duracao_total_s', 'volume_total_l'
+
+    folga_s é o intervalo reservado depois de cada bomba antes de liberar
+    a vazão dela (abertura da serial e reset do Arduino).
+    """
+    agora = agora or datetime.datetime.now()
+    execucoes, adiadas = [], []
+
+    pendentes = []
+    for zona in zonas:
+        litros, dur_s = duracao_bomba_s(zona['quantidade_mm'], zona['area_m2'], zona['vazao_lph'])
+        if dur_s <= 0:
+            continue
+        item = dict(zona, litros=litros, duracao_s=dur_s)
+        if zona['vazao_lph'] > vazao_max_lph:
+            adiadas.append(dict(item, motivo="vazão da bomba acima da capacidade da linha"))
+            continue
+        pendentes.append(item)
+
+    # Tanque: prioriza as zonas com maior lâmina (mais secas)
+    if volume_tanque_l is not None:
+        pendentes.sort(key=lambda z: z['quantidade_mm'], reverse=True)
+        restante = volume_tanque_l
+        cabem = []
+        for item in pendentes:
+            if item['litros'] <= restante:
+                restante -= item['litros']
+                cabem.append(item)
+            else:
+                adiadas.append(dict(item, motivo="volume do tanque insuficiente"))
+        pendentes = cabem
+
+    # Janela fora de pico: fora dela nada roda neste ciclo
+    limite_s = None
+    if janelas_fora_pico:
+        fim_janela = fim_janela_atual(agora, janelas_fora_pico)
+        if fim_janela is None:
+            adiadas.extend(dict(item, motivo="fora da janela fora de pico") for item in pendentes)
+            pendentes = []
+        else:
+            limite_s = (fim_janela - agora).total_seconds()
+
+    # Escalonamento guloso: maior duração primeiro, liga tudo que couber na
+    # vazão livre e cujo Arduino (porta) esteja livre
+    pendentes.sort(key=lambda z: z['duracao_s'], reverse=True)
+    t = 0
+    em_execucao = []  # (fim_s, vazao_lph, porta)
+    while pendentes:
+        vazao_livre = vazao_max_lph - sum(v for _, v, _ in em_execucao)
+        portas_ocupadas = {p for _, _, p in em_execucao if p is not None}
+        for item in list(pendentes):
+            porta = item.get('porta')
+            if item['vazao_lph'] <= vazao_livre and porta not in portas_ocupadas:
+                pendentes.remove(item)
+                if limite_s is not None and t + item['duracao_s'] > limite_s:
+                    adiadas.append(dict(item, motivo="não termina dentro da janela fora de pico"))
+                    continue
+                execucoes.append(dict(item, inicio_s=t, fim_s=t + item['duracao_s']))
+                em_execucao.append((t + item['duracao_s'] + folga_s, item['vazao_lph'], porta))
+                vazao_livre -= item['vazao_lph']
+                if porta is not None:
+                    portas_ocupadas.add(porta)
+        if pendentes:
+            # Avança até a próxima bomba desligar e libera a vazão e a porta dela
+            t = min(fim for fim, _, _ in em_execucao)
+            em_execucao = [e for e in em_execucao if e[0] > t]
+
+    execucoes.sort(key=lambda z: z['inicio_s'])
+    return {
+        "inicio": agora,
+        "execucoes": execucoes,
+        "adiadas": adiadas,
+        "duracao_total_s": max((z['fim_s'] for z in execucoes), default=0),
+        "volume_total_l": sum(z['litros'] for z in execucoes),
+    }
+
+
+def imprimir_plano(plano):
+    print(f"Plano de irrigação: início {plano['inicio']:%Y-%m-%d %H:%M}, "
+          f"duração total {plano['duracao_total_s']} s, volume {plano['volume_total_l']:.2f} L")
+    for z in plano['execucoes']:
+        print(f"   Zona {z['nome']}: {z['litros']:.2f} L, de {z['inicio_s']} s a {z['fim_s']} s")
+    for z in plano['adiadas']:
+        print(f"   [Aviso] Zona {z['nome']} adiada: {z['motivo']}")
+
+
+def executar_plano(plano, acionar):
+    """
+    Executa o plano: cada zona roda numa thread que espera o seu inicio_s e
+    chama acionar(zona). Retorna {nome_zona: retorno de acionar}.
+
+    O acesso à serial é serializado por porta: mesmo que o plano tenha sido
+    montado sem 'porta', duas zonas nunca abrem o mesmo Arduino ao mesmo tempo.
+    """
+    resultados = {}
+    travas = {zona.get('porta'): threading.Lock() for zona in plano['execucoes']}
+    t0 = time.monotonic()
+
+    def _rodar(zona):
+        atraso = zona['inicio_s'] - (time.monotonic() - t0)
+        if atraso > 0:
+            time.sleep(atraso)
+        try:
+            with travas[zona.get('porta')]:
+                resultados[zona['nome']] = acionar(zona)
+        except Exception as e:
+            print(f"[Erro Critico] Falha ao acionar a bomba da zona {zona['nome']}: {e}")
+            resultados[zona['nome']] = None
+
+    threads = [threading.Thread(target=_rodar, args=(zona,), name=f"bomba_{zona['nome']}")
+               for zona in plano['execucoes']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Ingestão em blocos (streaming) dos arquivos de clima das estações.
+
+Os arquivos de clima são separados por tabulação, mas cada estação usa
+nomes de colunas diferentes (Cordoba: 'Tmin(C)', 'Et0(mm)'; Hyderabad:
+'MinTemp', 'ReferenceET'). Este módulo lê os arquivos bloco a bloco,
+normaliza o esquema para os nomes usados nos datasets de treino,
+valida e preenche falhas, e alimenta as etapas seguintes (ETo, montagem
+das janelas de 3 dias e backtesting) por geradores. Só um bloco (mais
+algumas linhas de borda) fica em memória, qualquer que seja o tamanho
+do arquivo.
+
+Exemplo:
+    blocos = ler_clima_em_blocos("Dados_de_Treinamento/Cordoba/cordoba_climate.txt")
+    blocos = etapa_eto(validar_e_preencher(blocos), latitudes=-31.4)
+    for janelas in janelas_3dias(blocos):
+        ...
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Nome canônico -> aliases encontrados nos arquivos de clima
+ALIASES_COLUNAS = {
+    'Day': ['Day', 'Dia'],
+    'Month': ['Month', 'Mes', 'Mês'],
+    'Year': ['Year', 'Ano'],
+    'MinTemp': ['MinTemp', 'Tmin(C)', 'Tmin'],
+    'MaxTemp': ['MaxTemp', 'Tmax(C)', 'Tmax'],
+    'Precipitation': ['Precipitation', 'Prcp(mm)', 'Prcp'],
+    'ReferenceET': ['ReferenceET', 'Et0(mm)', 'Et0', 'ETo'],
+}
+VARIAVEIS = ['MinTemp', 'MaxTemp', 'Precipitation', 'ReferenceET']
+# Variáveis preenchidas por interpolação (a chuva ausente vira 0)
+INTERPOLADAS = ['MinTemp', 'MaxTemp', 'ReferenceET']
+
+# Faixas físicas aceitas; valores fora viram falha e são preenchidos
+LIMITES = {
+    'MinTemp': (-60.0, 60.0),
+    'MaxTemp': (-60.0, 60.0),
+    'Precipitation': (0.0, 1000.0),
+    'ReferenceET': (0.0, 30.0),
+}
+
+
+# --------------------
+# Leitura e normalização
+# --------------------
+
+def normalizar_esquema(df, estacao=None):
+    """Renomeia as colunas para o esquema canônico e cria a coluna 'data'."""
+    renomear = {}
+    for canonico, aliases in ALIASES_COLUNAS.items():
+        for alias in aliases:
+            if alias in df.columns:
+                renomear[alias] = canonico
+                break
+    df = df.rename(columns=renomear)
+
+    faltando = [c for c in ('Day', 'Month', 'Year', 'MinTemp', 'MaxTemp', 'Precipitation')
+                if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no arquivo de clima: {faltando}")
+    if 'ReferenceET' not in df.columns:
+        df['ReferenceET'] = np.nan  # calculada depois pela etapa_eto
+
+    df['data'] = pd.to_datetime(
+        dict(year=df['Year'], month=df['Month'], day=df['Day']), errors='coerce')
+    df = df[['data'] + VARIAVEIS].copy()
+    for coluna in VARIAVEIS:
+        df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+    if estacao is not None:
+        df['estacao'] = estacao
+    return df
+
+
+def ler_clima_em_blocos(caminho, tamanho_bloco=50_000, estacao=None):
+    """Gera DataFrames normalizados de até tamanho_bloco linhas de um arquivo de clima."""
+    for bloco in pd.read_csv(caminho, sep='\t', chunksize=tamanho_bloco):
+        yield normalizar_esquema(bloco, estacao)
+
+
+def ler_estacoes_em_blocos(arquivos, tamanho_bloco=50_000):
+    """
+    Lê várias estações em sequência. arquivos: dict {estacao: caminho}.
+    Os blocos saem agrupados por estação (nunca misturam duas estações).
+    """
+    for estacao, caminho in arquivos.items():
+        yield from ler_clima_em_blocos(caminho, tamanho_bloco, estacao)
+
+
+# --------------------
+# Validação e preenchimento
+# --------------------
+
+def _marcar_invalidos(df):
+    for coluna, (minimo, maximo) in LIMITES.items():
+        fora = (df[coluna] < minimo) | (df[coluna] > maximo)
+        df.loc[fora, coluna] = np.nan
+    invertidas = df['MinTemp'] > df['MaxTemp']
+    df.loc[invertidas, ['MinTemp', 'MaxTemp']] = np.nan
+    return df
+
+
+def _tamanho_falhas(serie):
+    """Para cada posição NaN, o tamanho da sequência de NaN a que ela pertence (0 nas válidas)."""
+    falha = serie.isna()
+    grupos = (falha != falha.shift()).cumsum()
+    return falha.groupby(grupos).transform('sum').where(falha, 0)
+
+
+def _interpolar_falhas_curtas(serie, max_falha_dias):
+    """Interpola só as falhas internas de até max_falha_dias dias; as maiores ficam inteiras em NaN."""
+    longas = _tamanho_falhas(serie) > max_falha_dias
+    return serie.interpolate(limit_area='inside').mask(longas)
+
+
+def _preencher(df, max_falha_dias):
+    """Reindexa para dias corridos e preenche falhas de até max_falha_dias dias."""
+    df = df.dropna(subset=['data']).drop_duplicates('data', keep='last').set_index('data')
+    df = df.reindex(pd.date_range(df.index.min(), df.index.max(), freq='D'))
+    df.index.name = 'data'
+    ja_preenchido = (df['preenchido'].astype('boolean').fillna(False).astype(bool)
+                     if 'preenchido' in df.columns else False)
+    df['preenchido'] = df[['MinTemp', 'MaxTemp', 'Precipitation']].isna().any(axis=1) | ja_preenchido
+
+    for coluna in INTERPOLADAS:
+        df[coluna] = _interpolar_falhas_curtas(df[coluna], max_falha_dias)
+    # Chuva não se interpola: dia sem registro conta como dia sem chuva
+    df['Precipitation'] = df['Precipitation'].fillna(0.0)
+    return df.reset_index()
+
+
+def validar_e_preencher(blocos, max_falha_dias=5):
+    """
+    Valida faixas físicas e preenche dias ausentes ou inválidos, bloco a bloco.
+
+    Só falhas de até max_falha_dias dias seguidos são preenchidas; falhas
+    maiores ficam inteiras sem preenchimento, e os dias sem temperatura
+    são descartados (com aviso). A ReferenceET pode seguir em NaN para a
+    etapa_eto.
+
+    Para interpolar através da fronteira entre blocos, a última linha em
+    que todas as variáveis interpoladas são válidas (a âncora) é
+    reaproveitada no início do próximo bloco, e as linhas depois dela
+    ficam retidas até lá. Uma variável cuja falha no fim do bloco já passa
+    de max_falha_dias não será preenchida de qualquer forma e não entra na
+    escolha da âncora. Assim o resultado independe do tamanho do bloco.
+    """
+    retidas = None
+    estacao_atual = None
+    descartadas = 0
+
+    for bloco in blocos:
+        bloco = _marcar_invalidos(bloco)
+        estacao = bloco['estacao'].iloc[0] if 'estacao' in bloco.columns and len(bloco) else None
+
+        if retidas is not None and estacao != estacao_atual:
+            # Troca de estação: o que sobrou da anterior sai como está
+            saida, n = _finalizar(retidas, max_falha_dias)
+            descartadas += n
+            if len(saida):
+                yield saida
+            retidas = None
+        estacao_atual = estacao
+
+        if retidas is not None:
+            bloco = pd.concat([retidas, bloco], ignore_index=True)
+        if bloco.empty:
+            continue
+
+        preenchido = _preencher(bloco, max_falha_dias)
+        if estacao is not None:
+            preenchido['estacao'] = estacao
+
+        colunas_ancora = [c for c in INTERPOLADAS
+                          if _tamanho_falhas(preenchido[c]).iloc[-1] <= max_falha_dias]
+        completas = preenchido[colunas_ancora].notna().all(axis=1).to_numpy()
+        if not completas.any():
+            retidas = bloco
+            continue
+        ultima = int(np.flatnonzero(completas)[-1])
+        # A âncora fica também como primeira linha do próximo bloco
+        retidas = preenchido.iloc[ultima:]
+        saida = preenchido.iloc[:ultima]
+        n_antes = len(saida)
+        saida = saida.dropna(subset=VARIAVEIS[:2])
+        descartadas += n_antes - len(saida)
+        if len(saida):
+            yield saida
+
+    if retidas is not None:
+        saida, n = _finalizar(retidas, max_falha_dias)
+        descartadas += n
+        if len(saida):
+            yield saida
+
+    if descartadas:
+        print(f"[Aviso] {descartadas} dias descartados por falhas maiores que {max_falha_dias} dias.")
+
+
+def _finalizar(retidas, max_falha_dias):
+    estacao = retidas['estacao'].iloc[0] if 'estacao' in retidas.columns else None
+    saida = _preencher(retidas, max_falha_dias)
+    if estacao is not None:
+        saida['estacao'] = estacao
+    n_antes = len(saida)
+    saida = saida.dropna(subset=VARIAVEIS[:2])
+    return saida, n_antes - len(saida)
+
+
+# --------------------
+# Etapa de ETo
+# --------------------
+
+def radiacao_extraterrestre_mm(latitude, dia_do_ano):
+    """Ra (FAO-56, eq. 21) convertida para mm/dia de evaporação equivalente."""
+    phi = math.radians(latitude)
+    j = np.asarray(dia_do_ano, dtype=float)
+    dr = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    decl = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(decl), -1, 1))
+    ra_mj = (24 * 60 / np.pi) * 0.0820 * dr * (
+        ws * np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.sin(ws))
+    return 0.408 * ra_mj
+
+
+def _latitude_do_bloco(latitudes, estacao):
+    """Resolve a latitude de uma estação: número único, dict {estacao: latitude} ou função."""
+    if latitudes is None or isinstance(latitudes, (int, float)):
+        return latitudes
+    if callable(latitudes):
+        return latitudes(estacao)
+    return latitudes.get(estacao)
+
+
+def etapa_eto(blocos, latitudes=None):
+    """
+    Completa a ReferenceET ausente com Hargreaves-Samani (só temperatura),
+    já que os arquivos de clima não trazem umidade relativa, vento nem
+    radiação para a Penman-Monteith de main.py.
+
+    latitudes pode ser um número (fluxo de uma só estação), um dict
+    {estacao: latitude} ou uma função estacao -> latitude; a latitude é
+    escolhida por bloco a partir da coluna 'estacao'. Se uma estação com
+    ETo ausente não tem latitude, levanta ValueError. Sem latitudes, os
+    blocos passam inalterados.
+    """
+    for bloco in blocos:
+        faltando = bloco['ReferenceET'].isna()
+        if latitudes is not None and faltando.any():
+            estacao = bloco['estacao'].iloc[0] if 'estacao' in bloco.columns else None
+            latitude = _latitude_do_bloco(latitudes, estacao)
+            if latitude is None:
+                raise ValueError(
+                    f"Estação '{estacao}' tem ReferenceET ausente e não tem latitude para a etapa_eto.")
+            tmin, tmax = bloco['MinTemp'], bloco['MaxTemp']
+            ra = radiacao_extraterrestre_mm(latitude, bloco['data'].dt.dayofyear)
+            eto = 0.0023 * ra * ((tmax + tmin) / 2 + 17.8) * np.sqrt(np.maximum(tmax - tmin, 0))
+            bloco = bloco.copy()
+            bloco.loc[faltando, 'ReferenceET'] = np.maximum(eto[faltando], 0)
+        yield bloco
+
+
+# --------------------
+# Montagem do dataset (janelas de 3 dias)
+# --------------------
+
+def janelas_3dias(blocos):
+    """
+    Gera, por bloco, as features climáticas das janelas de 3 dias no
+    formato dos CSVs ciclos_3dias (date_inicial, date_final,
+    MinTemp_dia1..3, MaxTemp_dia1..3, Precipitation_dia1..3, ReferenceET_dia1..3).
+    As 2 últimas linhas de cada bloco são levadas ao bloco seguinte para
+    que nenhuma janela se perca na fronteira.
+
+    As colunas de umidade (th1) vêm da simulação de balanço hídrico e não
+    são geradas aqui.
+    """
+    borda = None
+    for bloco in blocos:
+        if borda is not None:
+            if 'estacao' in bloco.columns and len(bloco) and \
+                    bloco['estacao'].iloc[0] != borda['estacao'].iloc[0]:
+                borda = None
+            else:
+                bloco = pd.concat([borda, bloco], ignore_index=True)
+        if len(bloco) < 3:
+            borda = bloco
+            continue
+
+        d1, d2, d3 = bloco.iloc[:-2], bloco.iloc[1:-1], bloco.iloc[2:]
+        janelas = pd.DataFrame({
+            'date_inicial': d1['data'].dt.strftime('%Y-%m-%d').to_numpy(),
+            'date_final': d3['data'].dt.strftime('%Y-%m-%d').to_numpy(),
+        })
+        if 'estacao' in bloco.columns:
+            janelas['estacao'] = d1['estacao'].to_numpy()
+        for variavel in VARIAVEIS:
+            for i, dia in enumerate((d1, d2, d3), start=1):
+                janelas[f'{variavel}_dia{i}'] = dia[variavel].to_numpy()
+        # Só janelas de 3 dias consecutivos (sem buraco descartado no meio)
+        consecutivas = (d3['data'].to_numpy() - d1['data'].to_numpy()) == np.timedelta64(2, 'D')
+        yield janelas[consecutivas].reset_index(drop=True)
+        borda = bloco.iloc[-2:]
+
+
+# --------------------
+# Backtesting
+# --------------------
+
+def ler_csv_em_blocos(caminho, tamanho_bloco=50_000, colunas=None):
+    """Lê um dataset ciclos_3dias (CSV) bloco a bloco."""
+    yield from pd.read_csv(caminho, chunksize=tamanho_bloco, usecols=colunas)
+
+
+def backtest_em_blocos(blocos, modelo, features, alvos):
+    """
+    Avalia um modelo sobre um dataset em blocos, acumulando só somas
+    (n, erro absoluto, erro quadrático, soma e soma dos quadrados do alvo).
+    Retorna {alvo: {'MAE': ..., 'R2': ..., 'n': ...}}.
+    """
+    n = 0
+    soma_abs = np.zeros(len(alvos))
+    soma_sq = np.zeros(len(alvos))
+    soma_y = np.zeros(len(alvos))
+    soma_y2 = np.zeros(len(alvos))
+
+    for bloco in blocos:
+        if bloco.empty:
+            continue
+        y = bloco[alvos].to_numpy(dtype=float)
+        y_pred = np.asarray(modelo.predict(bloco[features]), dtype=float).reshape(len(y), -1)
+        erro = y_pred - y
+        n += len(y)
+        soma_abs += np.abs(erro).sum(axis=0)
+        soma_sq += (erro ** 2).sum(axis=0)
+        soma_y += y.sum(axis=0)
+        soma_y2 += (y ** 2).sum(axis=0)
+
+    if n == 0:
+        return {}
+    sst = soma_y2 - soma_y ** 2 / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(sst > 0, 1 - soma_sq / sst, np.nan)
+    return {alvo: {'MAE': float(soma_abs[i] / n), 'R2': float(r2[i]), 'n': n}
+            for i, alvo in enumerate(alvos)}
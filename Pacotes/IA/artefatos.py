@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Formato de artefato mapeável em memória para as florestas do sistema.
+
+O joblib/pickle desserializa a floresta inteira no heap do processo e o
+sklearn copia os nós de cada árvore mesmo com mmap_mode. Aqui as árvores
+de uma floresta são exportadas para arrays planos (feature, limiar,
+filhos, valores), gravados sem compressão num único arquivo binário com
+cada array começando num limite de página. A carga é um np.memmap
+somente leitura: não há desserialização, e as páginas ficam no page
+cache, compartilhadas entre todos os processos que usam o modelo.
+
+Um manifesto JSON acompanha o binário com a ordem das features, o hash
+do dataset de treino (e, para cada atualização incremental, a data e o
+hash do log de campo usado), a versão do sklearn usada na exportação e o
+SHA-256 do binário. Um artefato com ordem de features diferente da
+esperada, ou com hash que não confere, é recusado na carga.
+
+Estrutura de um artefato (diretório):
+    modelo_umidade_treinado.modelo/
+        manifesto.json
+        arvores-<sha256[:12]>.bin
+
+Conversão de um modelo joblib existente (a partir da raiz do projeto):
+    python -m Pacotes.IA.artefatos umidade modelo_umidade_treinado.joblib [--dataset caminho.csv]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FORMATO_VERSAO = 1
+PAGINA = 4096
+MANIFESTO = "manifesto.json"
+
+
+class ArtefatoInvalido(ValueError):
+    """Artefato recusado: manifesto incompatível ou binário corrompido."""
+
+
+def sha256_arquivo(caminho, tamanho_bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def caminho_artefato(caminho_joblib):
+    """Diretório do artefato mapeável correspondente a um arquivo .joblib."""
+    return os.path.splitext(caminho_joblib)[0] + ".modelo"
+
+
+# --------------------
+# Exportação
+# --------------------
+
+def _arrays_floresta(modelo):
+    """Concatena os nós de todas as árvores em arrays planos com índices globais."""
+    arvores = [estimador.tree_ for estimador in modelo.estimators_]
+    classificador = hasattr(modelo, "classes_")
+    offsets = np.cumsum([0] + [a.node_count for a in arvores])
+
+    filho_esq, filho_dir, feature, limiar, valor = [], [], [], [], []
+    for arvore, offset in zip(arvores, offsets[:-1]):
+        esq = arvore.children_left.astype(np.int32)
+        dir_ = arvore.children_right.astype(np.int32)
+        filho_esq.append(np.where(esq >= 0, esq + offset, -1))
+        filho_dir.append(np.where(dir_ >= 0, dir_ + offset, -1))
+        feature.append(arvore.feature.astype(np.int32))
+        limiar.append(arvore.threshold.astype(np.float64))
+        v = arvore.value.astype(np.float64)  # (nós, saídas, classes)
+        if classificador:
+            # Versões antigas do sklearn guardam contagens; normaliza para probabilidades
+            v = v[:, 0, :] / np.maximum(v[:, 0, :].sum(axis=1, keepdims=True), 1e-300)
+        else:
+            v = v[:, :, 0]
+        valor.append(v)
+
+    return {
+        "raizes": offsets[:-1].astype(np.int64),
+        "filho_esq": np.concatenate(filho_esq).astype(np.int32),
+        "filho_dir": np.concatenate(filho_dir).astype(np.int32),
+        "feature": np.concatenate(feature),
+        "limiar": np.concatenate(limiar),
+        "valor": np.ascontiguousarray(np.concatenate(valor)),
+    }
+
+
+def salvar_artefato(modelo, diretorio, features, caminho_dataset=None,
+                    hash_dataset=None, atualizacoes=None):
+    """
+    Exporta uma RandomForest (regressor ou classificador) para o formato
+    mapeável. A troca é atômica para leitores: o binário novo é gravado
+    com nome próprio e só depois o manifesto passa a apontar para ele.
+
+    hash_dataset informa o hash do dataset de treino quando o CSV não está
+    disponível (re-exportação de um modelo já exportado); atualizacoes é a
+    lista de atualizações incrementais aplicadas desde o treino original.
+    """
+    import sklearn
+
+    features = list(features)
+    n_features = getattr(modelo, "n_features_in_", len(features))
+    if n_features != len(features):
+        raise ArtefatoInvalido(
+            f"O modelo tem {n_features} features, mas foram informadas {len(features)}.")
+    nomes_modelo = getattr(modelo, "feature_names_in_", None)
+    if nomes_modelo is not None and list(nomes_modelo) != features:
+        raise ArtefatoInvalido(
+            f"Ordem de features do modelo {list(nomes_modelo)} difere da informada {features}.")
+    classificador = hasattr(modelo, "classes_")
+    if classificador and modelo.n_outputs_ != 1:
+        raise ArtefatoInvalido("Classificador com mais de uma saída não é suportado.")
+
+    os.makedirs(diretorio, exist_ok=True)
+    arrays = _arrays_floresta(modelo)
+
+    # Grava cada array num limite de página
+    tmp_bin = os.path.join(diretorio, "arvores.bin.tmp")
+    descricao = {}
+    with open(tmp_bin, "wb") as f:
+        for nome, array in arrays.items():
+            deslocamento = -(-f.tell() // PAGINA) * PAGINA
+            f.write(b"\0" * (deslocamento - f.tell()))
+            f.write(array.tobytes(order="C"))
+            descricao[nome] = {"dtype": array.dtype.str, "shape": list(array.shape),
+                               "offset": deslocamento}
+        f.flush()
+        os.fsync(f.fileno())
+
+    sha = sha256_arquivo(tmp_bin)
+    nome_bin = f"arvores-{sha[:12]}.bin"
+    os.replace(tmp_bin, os.path.join(diretorio, nome_bin))
+
+    manifesto = {
+        "formato": FORMATO_VERSAO,
+        "tipo": "classificacao" if classificador else "regressao",
+        "features": features,
+        "n_saidas": int(modelo.n_outputs_),
+        "classes": [c.item() if hasattr(c, "item") else c for c in modelo.classes_]
+        if classificador else None,
+        "n_arvores": len(modelo.estimators_),
+        "profundidade_max": int(max(e.tree_.max_depth for e in modelo.estimators_)),
+        "versao_sklearn": sklearn.__version__,
+        "hash_dataset_treino": sha256_arquivo(caminho_dataset) if caminho_dataset else hash_dataset,
+        "atualizacoes_incrementais": list(atualizacoes or []),
+        "arquivo": nome_bin,
+        "sha256": sha,
+        "arrays": descricao,
+    }
+    tmp_manifesto = os.path.join(diretorio, MANIFESTO + ".tmp")
+    with open(tmp_manifesto, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_manifesto, os.path.join(diretorio, MANIFESTO))
+
+    # Binários antigos: processos que ainda os mapeiam continuam funcionando após o unlink
+    for antigo in glob.glob(os.path.join(diretorio, "arvores-*.bin")):
+        if os.path.basename(antigo) != nome_bin:
+            os.remove(antigo)
+    return manifesto
+
+
+# --------------------
+# Carga e previsão
+# --------------------
+
+class FlorestaMapeada:
+    """
+    Floresta avaliada diretamente sobre os arrays mapeados.
+    Oferece predict (e predict_proba no classificador) como o sklearn.
+    """
+
+    def __init__(self, manifesto, arrays):
+        self.manifesto = manifesto
+        self.features = manifesto["features"]
+        self.classes_ = np.array(manifesto["classes"]) if manifesto["classes"] is not None else None
+        self._raizes = arrays["raizes"]
+        self._filho_esq = arrays["filho_esq"]
+        self._filho_dir = arrays["filho_dir"]
+        self._feature = arrays["feature"]
+        self._limiar = arrays["limiar"]
+        self._valor = arrays["valor"]
+
+    def _matriz(self, X):
+        if hasattr(X, "columns"):
+            if list(X.columns) != self.features:
+                raise ArtefatoInvalido(
+                    f"Colunas da entrada {list(X.columns)} diferem das do modelo {self.features}.")
+            X = X.to_numpy()
+        # O sklearn avalia as árvores em float32
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Entrada deve ter forma (n, {len(self.features)}).")
+        if np.isnan(X).any():
+            raise ValueError("Entrada contém NaN.")
+        return X
+
+    def _folhas(self, X):
+        """Índice global da folha alcançada em cada árvore: forma (n_linhas, n_arvores)."""
+        nos = np.broadcast_to(np.asarray(self._raizes), (len(X), len(self._raizes))).copy()
+        linhas = np.arange(len(X))[:, None]
+        for _ in range(self.manifesto["profundidade_max"]):
+            esq = self._filho_esq[nos]
+            ativos = esq >= 0
+            if not ativos.any():
+                break
+            feature = np.where(ativos, self._feature[nos], 0)
+            vai_esq = X[linhas, feature] <= self._limiar[nos]
+            nos = np.where(ativos, np.where(vai_esq, esq, self._filho_dir[nos]), nos)
+        return nos
+
+    def predict_proba(self, X):
+        if self.classes_ is None:
+            raise AttributeError("predict_proba só existe para o classificador.")
+        return self._valor[self._folhas(self._matriz(X))].mean(axis=1)
+
+    def predict(self, X):
+        if self.classes_ is not None:
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        previsao = self._valor[self._folhas(self._matriz(X))].mean(axis=1)
+        return previsao[:, 0] if self.manifesto["n_saidas"] == 1 else previsao
+
+
+def ler_manifesto(diretorio):
+    with open(os.path.join(diretorio, MANIFESTO), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_artefato(diretorio, features_esperadas=None, verificar_hash=True):
+    """
+    Mapeia um artefato em memória. Recusa (ArtefatoInvalido) se a ordem das
+    features não for a esperada ou se o SHA-256 do binário não conferir.
+    """
+    manifesto = ler_manifesto(diretorio)
+    if manifesto.get("formato") != FORMATO_VERSAO:
+        raise ArtefatoInvalido(f"Formato de artefato não suportado: {manifesto.get('formato')}")
+    if features_esperadas is not None and manifesto["features"] != list(features_esperadas):
+        raise ArtefatoInvalido(
+            f"Ordem de features do artefato {manifesto['features']} difere da esperada "
+            f"{list(features_esperadas)}. Modelo recusado.")
+
+    caminho_bin = os.path.join(diretorio, manifesto["arquivo"])
+    if verificar_hash and sha256_arquivo(caminho_bin) != manifesto["sha256"]:
+        raise ArtefatoInvalido(f"SHA-256 de {caminho_bin} não confere com o manifesto.")
+
+    arrays = {
+        nome: np.memmap(caminho_bin, dtype=np.dtype(d["dtype"]), mode="r",
+                        offset=d["offset"], shape=tuple(d["shape"]))
+        for nome, d in manifesto["arrays"].items()
+    }
+    return FlorestaMapeada(manifesto, arrays)
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from Pacotes.IA.modelos import MODELOS, caminho_dados
+
+    parser = argparse.ArgumentParser(
+        description="Converte um modelo .joblib para o formato de artefato mapeável.")
+    parser.add_argument("modelo", choices=list(MODELOS))
+    parser.add_argument("joblib", help="Arquivo .joblib do modelo treinado")
+    parser.add_argument("--dataset", help="CSV de treino (padrão: dataset de Cordoba do modelo)")
+    args = parser.parse_args()
+
+    spec = MODELOS[args.modelo]
+    dataset = args.dataset or caminho_dados("Cordoba", spec["arquivo"])
+    manifesto = salvar_artefato(joblib.load(args.joblib), caminho_artefato(args.joblib),
+                                spec["features"], dataset if os.path.exists(dataset) else None)
+    print(f"Artefato salvo em '{caminho_artefato(args.joblib)}' "
+          f"({manifesto['n_arvores']} árvores, sha256 {manifesto['sha256'][:12]}...)")
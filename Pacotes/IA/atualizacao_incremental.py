@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Atualização incremental do modelo de umidade com os dados do campo.
+
+A cada ciclo, main.py registra no log de features a linha usada pelos
+modelos (umidade atual, previsões, clima, ETo, estresse) e a lâmina
+aplicada. A leitura de umidade de cada dia é usada para preencher o th1
+observado de D+1 e D+2 das linhas anteriores.
+
+Periodicamente (cron), as linhas completas ainda não usadas treinam
+algumas árvores novas que são adicionadas à floresta existente
+(warm_start), sem re-treinar todo o histórico. As árvores do treino
+original (Cordoba) formam uma base protegida que nunca é descartada; o
+orçamento de árvores (max_arvores) vale para o total, e quando ele é
+ultrapassado saem as árvores incrementais mais antigas.
+
+Só o modelo de umidade é atualizado: é o único cujo alvo (th1 do dia
+seguinte) é observado no campo. Os alvos do classificador e do modelo de
+irrigação são as próprias decisões do sistema.
+
+Uso (a partir da raiz do projeto):
+    python -m Pacotes.IA.atualizacao_incremental [--novas-arvores 10] [--max-arvores 150]
+"""
+
+import argparse
+import datetime
+import os
+
+import joblib
+import pandas as pd
+
+from Pacotes.IA.artefatos import caminho_artefato, ler_manifesto, salvar_artefato, sha256_arquivo
+from Pacotes.IA.modelos import BASE_DIR, FEATURES_CLASSIFICADOR, FEATURES_UMIDADE, MODELOS
+
+LOG_PATH = os.path.join(BASE_DIR, "log_ciclos.csv")
+MODEL_TH_PATH = os.path.join(BASE_DIR, MODELOS["umidade"]["artefato"])
+
+ALVOS_OBSERVADOS = ['th1_obs_dia2', 'th1_obs_dia3']
+COLUNAS_LOG = (['data', 'zona'] + FEATURES_CLASSIFICADOR +
+               ['IrrDia_1'] + ALVOS_OBSERVADOS + ['usado_em'])
+
+
+# --------------------
+# Log de features
+# --------------------
+
+def _ler_log(caminho):
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=COLUNAS_LOG)
+    return pd.read_csv(caminho, dtype={'zona': str, 'usado_em': str})
+
+
+def _salvar_atomico(df, caminho):
+    # Escreve num temporário e renomeia, para não corromper o log se o Pi desligar no meio
+    tmp = caminho + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, caminho)
+
+
+def registrar_ciclo(entrada_classificador_list, irrigacao_mm, zona="1",
+                    data=None, caminho=LOG_PATH, leitura_valida=True):
+    """
+    Adiciona a linha do ciclo de hoje ao log e usa o th1 medido hoje
+    (primeira feature, em fração) como observação de D+1 da linha de ontem
+    e de D+2 da linha de anteontem.
+
+    Com leitura_valida=False (falha do sensor, th1 é o valor padrão) nada
+    é registrado: nem a linha de hoje nem as observações dos dias anteriores.
+    """
+    if not leitura_valida:
+        print("[Aviso] Leitura do sensor inválida: ciclo não registrado no log de features.")
+        return
+    data = data or datetime.date.today()
+    zona = str(zona)
+    th1_hoje = float(entrada_classificador_list[0])
+
+    df = _ler_log(caminho)
+    if len(df):
+        datas = pd.to_datetime(df['data']).dt.date
+        da_zona = df['zona'] == zona
+        df.loc[da_zona & (datas == data - datetime.timedelta(days=1)), 'th1_obs_dia2'] = th1_hoje
+        df.loc[da_zona & (datas == data - datetime.timedelta(days=2)), 'th1_obs_dia3'] = th1_hoje
+        # Rodar duas vezes no mesmo dia substitui a linha do dia
+        df = df[~(da_zona & (datas == data))]
+
+    linha = dict(zip(FEATURES_CLASSIFICADOR, entrada_classificador_list))
+    linha.update({'data': data.isoformat(), 'zona': zona, 'IrrDia_1': float(irrigacao_mm)})
+    df = pd.concat([df, pd.DataFrame([linha], columns=COLUNAS_LOG)], ignore_index=True)
+    _salvar_atomico(df[COLUNAS_LOG], caminho)
+
+
+def dados_novos(df):
+    """
+    Seleciona as linhas completas ainda não usadas em nenhuma atualização.
+
+    O modelo de umidade não recebe a lâmina aplicada como feature, então
+    uma irrigação no dia (altera th1 de D+1 e D+2) ou no dia seguinte
+    (altera th1 de D+2) contamina os alvos observados. Só ficam as linhas
+    sem irrigação em D e em D+1; se a linha de D+1 da zona não existe, a
+    irrigação daquele dia é desconhecida e a linha também é descartada.
+    """
+    if df.empty:
+        return df
+    datas = pd.to_datetime(df['data'])
+    irrigou = df['IrrDia_1'].fillna(0) > 0
+    chaves_seguinte = pd.MultiIndex.from_arrays([df['zona'], datas + pd.Timedelta(days=1)])
+    irrigou_por_dia = pd.Series(irrigou.to_numpy(),
+                                index=pd.MultiIndex.from_arrays([df['zona'], datas]))
+    irrigou_seguinte = irrigou_por_dia.reindex(chaves_seguinte)  # NaN: D+1 sem registro
+
+    completas = df[ALVOS_OBSERVADOS].notna().all(axis=1)
+    nao_usadas = df['usado_em'].isna()
+    sem_irrigacao = ~irrigou & irrigou_seguinte.eq(False).to_numpy()
+    return df[completas & nao_usadas & sem_irrigacao]
+
+
+# --------------------
+# Crescimento da floresta
+# --------------------
+
+def crescer_floresta(modelo, X, y, n_novas=10, max_arvores=150, semente=None):
+    """
+    Treina n_novas árvores só com (X, y) e as adiciona à floresta já
+    treinada. As árvores que existiam antes da primeira atualização são a
+    base protegida (guardada em modelo.n_arvores_base_); se o total passar
+    de max_arvores, descartam-se só as árvores incrementais mais antigas.
+
+    Com warm_start, as sementes das árvores novas vêm do random_state do
+    modelo pulando as len(estimators_) primeiras; com o orçamento cheio o
+    total é sempre o mesmo e cada atualização repetiria as mesmas
+    sementes. Por isso cada chamada deve informar uma semente própria.
+    """
+    if not hasattr(modelo, "n_arvores_base_"):
+        modelo.n_arvores_base_ = len(modelo.estimators_)
+    n_base = modelo.n_arvores_base_
+    if max_arvores - n_base < n_novas:
+        raise ValueError(
+            f"max_arvores={max_arvores} não comporta a base de {n_base} árvores "
+            f"mais {n_novas} árvores novas.")
+
+    # Com warm_start o sklearn mantém as árvores existentes e só treina as novas
+    modelo.set_params(warm_start=True,
+                      n_estimators=len(modelo.estimators_) + n_novas)
+    if semente is not None:
+        modelo.set_params(random_state=semente)
+    modelo.fit(X, y)
+
+    if len(modelo.estimators_) > max_arvores:
+        base = modelo.estimators_[:n_base]
+        incrementais = modelo.estimators_[n_base:]
+        modelo.estimators_ = base + incrementais[-(max_arvores - n_base):]
+    modelo.set_params(warm_start=False, n_estimators=len(modelo.estimators_))
+    return modelo
+
+
+def _reexportar_artefato(modelo, diretorio, atualizacao):
+    """
+    Regrava o artefato mapeável mantendo a proveniência do manifesto
+    anterior: o hash do dataset do treino original segue valendo para as
+    árvores da base, e a atualização de hoje (data e hash do log de campo
+    antes de marcar as linhas como usadas) entra no histórico.
+    """
+    try:
+        anterior = ler_manifesto(diretorio)
+    except (OSError, ValueError):
+        print(f"[Aviso] Manifesto anterior de '{diretorio}' ilegível: "
+              "hash do dataset de treino e histórico de atualizações perdidos.")
+        anterior = {}
+    salvar_artefato(modelo, diretorio, FEATURES_UMIDADE,
+                    hash_dataset=anterior.get("hash_dataset_treino"),
+                    atualizacoes=anterior.get("atualizacoes_incrementais", []) + [atualizacao])
+
+
+def atualizar_modelo_umidade(n_novas=10, max_arvores=150, min_linhas=7,
+                             caminho_log=LOG_PATH, caminho_modelo=MODEL_TH_PATH):
+    """
+    Atualiza o modelo de umidade com os dados novos do log.
+    Retorna o número de linhas usadas (0 se não houve atualização).
+    """
+    df = _ler_log(caminho_log)
+    novos = dados_novos(df)
+    if len(novos) < min_linhas:
+        print(f"Apenas {len(novos)} linhas novas completas no log "
+              f"(mínimo {min_linhas}). Modelo não atualizado.")
+        return 0
+
+    try:
+        modelo = joblib.load(caminho_modelo)
+    except FileNotFoundError:
+        print(f"[Erro Critico] Arquivo do modelo de umidade não encontrado: {caminho_modelo}")
+        return 0
+
+    X = novos[FEATURES_UMIDADE].astype(float)
+    y = novos[ALVOS_OBSERVADOS].astype(float).to_numpy()
+    n_antes = len(modelo.estimators_)
+    hash_log = sha256_arquivo(caminho_log)
+    # Semente nova a cada atualização, reproduzível a partir do conteúdo do log
+    crescer_floresta(modelo, X, y, n_novas, max_arvores, semente=int(hash_log[:8], 16))
+    hoje = datetime.date.today().isoformat()
+
+    # As linhas são marcadas como usadas antes de gravar o modelo; se algo
+    # falhar depois, o log volta ao estado anterior e nada é gravado pela metade
+    df_anterior = df.copy()
+    df.loc[novos.index, 'usado_em'] = hoje
+    _salvar_atomico(df, caminho_log)
+    tmp = caminho_modelo + ".tmp"
+    try:
+        joblib.dump(modelo, tmp)
+        # Mantém o artefato mapeável, se em uso, em dia com o .joblib. Exportado
+        # antes da troca do .joblib: o manifesto só muda no fim da exportação
+        if os.path.isdir(caminho_artefato(caminho_modelo)):
+            _reexportar_artefato(modelo, caminho_artefato(caminho_modelo), {
+                "data": hoje,
+                "hash_log": hash_log,
+                "linhas": len(novos),
+                "n_arvores": len(modelo.estimators_),
+            })
+        os.replace(tmp, caminho_modelo)
+    except Exception:
+        _salvar_atomico(df_anterior, caminho_log)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    print(f"Modelo de umidade atualizado com {len(novos)} linhas: "
+          f"{n_antes} -> {len(modelo.estimators_)} árvores.")
+    return len(novos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Adiciona árvores ao modelo de umidade usando os dados observados no campo.")
+    parser.add_argument("--novas-arvores", type=int, default=10)
+    parser.add_argument("--max-arvores", type=int, default=150)
+    parser.add_argument("--min-linhas", type=int, default=7)
+    args = parser.parse_args()
+
+    atualizar_modelo_umidade(args.novas_arvores, args.max_arvores, args.min_linhas)
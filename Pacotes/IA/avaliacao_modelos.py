@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Avaliação cruzada dos modelos de umidade, irrigação e classificador.
+
+Estratégias:
+  - kfold:    K-fold embaralhado dentro de cada estação (estratificado no classificador)
+  - estacao:  leave-one-station-out (treina numa estação, testa na outra)
+  - temporal: divisões ordenadas no tempo sobre os arquivos Periodo1/Periodo2
+
+Os folds rodam em paralelo (joblib) e tanto os índices quanto os modelos
+treinados de cada fold ficam em cache no disco (joblib.Memory): ao rodar
+de novo, só são re-treinados os folds cujos dados ou parâmetros mudaram.
+Depois de cada avaliação o cache é reduzido a limite_cache_mb (saem os
+itens usados há mais tempo); uma varredura completa ocupa ~550 MB.
+
+Uso (a partir da raiz do projeto):
+    python -m Pacotes.IA.avaliacao_modelos [--estrategias kfold temporal] [--jobs 4]
+    python -m Pacotes.IA.avaliacao_modelos --limpar-cache
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.metrics import (
+    mean_absolute_error, precision_score, r2_score, recall_score)
+from sklearn.model_selection import KFold, StratifiedKFold, TimeSeriesSplit
+
+from Pacotes.IA.modelos import (
+    BASE_DIR, ESTACOES, MODELOS, caminho_dados, criar_estimador, parametros_modelo,
+    preparar_alvos)
+
+CACHE_DIR = os.path.join(BASE_DIR, ".cache_avaliacao")
+ESTRATEGIAS = ["kfold", "estacao", "temporal"]
+LIMITE_CACHE_MB = 1024  # comporta uma varredura completa, mas não várias versões de params
+
+memoria = Memory(CACHE_DIR, verbose=0)
+
+
+# --------------------
+# Dados
+# --------------------
+
+def carregar_dados(nome_modelo, estacao, arquivo=None):
+    """Lê o CSV de um modelo/estação e devolve (X, y) com as colunas na ordem do modelo."""
+    spec = MODELOS[nome_modelo]
+    df = pd.read_csv(caminho_dados(estacao, arquivo or spec["arquivo"]))
+    df = preparar_alvos(df)
+    if 'date_inicial' in df.columns:
+        # Garante ordem cronológica para as divisões temporais
+        df = df.sort_values('date_inicial', kind='mergesort').reset_index(drop=True)
+    X = df[spec["features"]]
+    y = df[spec["alvos"][0]] if len(spec["alvos"]) == 1 else df[spec["alvos"]]
+    return X, y
+
+
+# --------------------
+# Folds (em cache)
+# --------------------
+
+@memoria.cache
+def indices_folds(estrategia, n_amostras, y_estratificacao=None, n_folds=5, semente=42):
+    """Gera a lista de (idx_treino, idx_teste) de uma estratégia dentro de um dataset."""
+    if estrategia == "temporal":
+        divisor = TimeSeriesSplit(n_splits=n_folds)
+        return list(divisor.split(np.zeros(n_amostras)))
+    if y_estratificacao is not None:
+        divisor = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=semente)
+        return list(divisor.split(np.zeros(n_amostras), y_estratificacao))
+    divisor = KFold(n_splits=n_folds, shuffle=True, random_state=semente)
+    return list(divisor.split(np.zeros(n_amostras)))
+
+
+@memoria.cache
+def treinar_fold(tipo, params, X_treino, y_treino):
+    """
+    Treina o modelo de um fold. O resultado fica em cache, indexado pelos
+    dados e pelos hiperparâmetros (que por isso são passados já resolvidos).
+    """
+    modelo = criar_estimador(tipo, params)
+    modelo.fit(X_treino, y_treino)
+    return modelo
+
+
+def _avaliar_fold(nome_modelo, estrategia, estacao, fold, X_treino, y_treino, X_teste, y_teste):
+    spec = MODELOS[nome_modelo]
+    modelo = treinar_fold(spec["tipo"], parametros_modelo(nome_modelo, n_jobs=1),
+                          X_treino, y_treino)
+    y_pred = modelo.predict(X_teste)
+
+    linha = {"modelo": nome_modelo, "estrategia": estrategia,
+             "estacao_teste": estacao, "fold": fold,
+             "n_treino": len(X_treino), "n_teste": len(X_teste)}
+    if spec["tipo"] == "classificacao":
+        linha["precision"] = precision_score(y_teste, y_pred, zero_division=0)
+        linha["recall"] = recall_score(y_teste, y_pred, zero_division=0)
+    else:
+        y_true = np.asarray(y_teste).reshape(len(y_teste), -1)
+        y_pred = np.asarray(y_pred).reshape(len(y_teste), -1)
+        for i, alvo in enumerate(spec["alvos"]):
+            linha[f"MAE_{alvo}"] = mean_absolute_error(y_true[:, i], y_pred[:, i])
+            linha[f"R2_{alvo}"] = r2_score(y_true[:, i], y_pred[:, i])
+    return linha
+
+
+def _tarefas(nome_modelo, estrategia, n_folds):
+    """Gera os argumentos de cada fold de um modelo para uma estratégia."""
+    classificacao = MODELOS[nome_modelo]["tipo"] == "classificacao"
+
+    if estrategia == "kfold":
+        for estacao in ESTACOES:
+            X, y = carregar_dados(nome_modelo, estacao)
+            estrat = y.to_numpy() if classificacao else None
+            for fold, (tr, te) in enumerate(indices_folds("kfold", len(X), estrat, n_folds)):
+                yield (nome_modelo, estrategia, estacao, fold,
+                       X.iloc[tr], y.iloc[tr], X.iloc[te], y.iloc[te])
+
+    elif estrategia == "estacao":
+        dados = {estacao: carregar_dados(nome_modelo, estacao) for estacao in ESTACOES}
+        for fold, estacao_teste in enumerate(ESTACOES):
+            treino = [dados[e] for e in ESTACOES if e != estacao_teste]
+            X_treino = pd.concat([X for X, _ in treino], ignore_index=True)
+            y_treino = pd.concat([y for _, y in treino], ignore_index=True)
+            X_teste, y_teste = dados[estacao_teste]
+            yield (nome_modelo, estrategia, estacao_teste, fold,
+                   X_treino, y_treino, X_teste, y_teste)
+
+    elif estrategia == "temporal":
+        for estacao in ESTACOES:
+            for arquivo in MODELOS[nome_modelo]["arquivos_periodo"]:
+                X, y = carregar_dados(nome_modelo, estacao, arquivo)
+                periodo = "P1" if "eriodo1" in arquivo else "P2"
+                for fold, (tr, te) in enumerate(indices_folds("temporal", len(X), None, n_folds)):
+                    yield (nome_modelo, f"{estrategia}_{periodo}", estacao, fold,
+                           X.iloc[tr], y.iloc[tr], X.iloc[te], y.iloc[te])
+    else:
+        raise ValueError(f"Estratégia desconhecida: {estrategia}")
+
+
+# --------------------
+# Execução
+# --------------------
+
+def avaliar(modelos=None, estrategias=None, n_folds=5, n_jobs=-1,
+            limite_cache_mb=LIMITE_CACHE_MB):
+    """
+    Roda todas as combinações modelo x estratégia em paralelo.
+    Retorna (resultados_por_fold, tabela_resumo) como DataFrames.
+    """
+    modelos = modelos or list(MODELOS)
+    estrategias = estrategias or ESTRATEGIAS
+
+    tarefas = [t for nome in modelos for est in estrategias
+               for t in _tarefas(nome, est, n_folds)]
+    print(f"Avaliando {len(tarefas)} folds ({len(modelos)} modelos, "
+          f"estratégias: {', '.join(estrategias)})...")
+
+    linhas = Parallel(n_jobs=n_jobs)(delayed(_avaliar_fold)(*t) for t in tarefas)
+    por_fold = pd.DataFrame(linhas)
+    # Sem limite, cada mudança de dados ou params deixaria mais uma cópia de todas as florestas
+    memoria.reduce_size(bytes_limit=int(limite_cache_mb * 1024 ** 2))
+
+    metricas = [c for c in por_fold.columns if c.startswith(("MAE_", "R2_"))
+                or c in ("precision", "recall")]
+    resumo = (por_fold
+              .groupby(["modelo", "estrategia", "estacao_teste"], sort=False)[metricas]
+              .agg(["mean", "std"]))
+    return por_fold, resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação cruzada dos modelos de irrigação.")
+    parser.add_argument("--modelos", nargs="+", choices=list(MODELOS))
+    parser.add_argument("--estrategias", nargs="+", choices=ESTRATEGIAS)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1,
+                        help="Número de processos (-1 = todos os núcleos)")
+    parser.add_argument("--saida", default=os.path.join(BASE_DIR, "metricas_avaliacao.csv"))
+    parser.add_argument("--limite-cache-mb", type=float, default=LIMITE_CACHE_MB,
+                        help="Tamanho máximo do cache de folds em disco")
+    parser.add_argument("--limpar-cache", action="store_true",
+                        help="Apaga o cache de folds e modelos e sai")
+    args = parser.parse_args()
+
+    if args.limpar_cache:
+        memoria.clear(warn=False)
+        print(f"Cache de avaliação '{CACHE_DIR}' apagado.")
+        raise SystemExit(0)
+
+    por_fold, resumo = avaliar(args.modelos, args.estrategias, args.folds, args.jobs,
+                               args.limite_cache_mb)
+
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", None)
+    print("\n--- Métricas (média e desvio entre folds) ---")
+    for nome in resumo.index.get_level_values("modelo").unique():
+        # Mostra só as métricas que se aplicam a cada modelo
+        print(f"\n[{nome}]")
+        print(resumo.loc[nome].dropna(axis=1, how="all").round(4))
+
+    por_fold.to_csv(args.saida, index=False)
+    print(f"\nMétricas por fold salvas em '{args.saida}'")
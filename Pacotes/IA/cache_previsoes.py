@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Cache LRU de previsões na frente de cada modelo.
+
+Entre zonas e ciclos do mesmo dia as linhas de entrada dos modelos
+costumam diferir só abaixo da precisão dos sensores: a parte da
+WeatherAPI é idêntica e a umidade varia frações de um por cento. As
+features são quantizadas numa resolução por feature e a tupla
+quantizada vira a chave do cache, evitando avaliar a floresta de novo.
+
+O modelo é carregado uma única vez e recarregado (com o cache limpo)
+sempre que o arquivo do artefato muda no disco, por exemplo depois de
+uma atualização incremental. caminho_modelo pode ser um .joblib ou um
+diretório de artefato mapeável (Pacotes/IA/artefatos.py); neste caso a
+ordem das features é conferida com o manifesto na carga. A carga de um
+.joblib é sempre avisada, e um .joblib salvo com outra versão do sklearn
+é avisado com as duas versões, já que sem o manifesto nada é conferido.
+"""
+
+import os
+import warnings
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from Pacotes.IA.artefatos import MANIFESTO, carregar_artefato
+
+# Resolução por prefixo de feature (antes de "_dia"), na unidade de entrada do modelo
+RESOLUCOES_PADRAO = {
+    'th1': 0.001,               # fração 0-1, ~0.1 % de umidade
+    'MinTemp': 0.1,             # °C
+    'MaxTemp': 0.1,             # °C
+    'Precipitation': 0.1,       # mm
+    'ReferenceET': 0.01,        # mm/dia
+    'Estresse_hidrico': 0.01,
+}
+
+
+def _assinatura_arquivo(caminho):
+    if os.path.isdir(caminho):
+        # O manifesto é o último arquivo trocado quando um artefato é regravado
+        caminho = os.path.join(caminho, MANIFESTO)
+    info = os.stat(caminho)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _carregar_joblib(caminho):
+    """Carrega um .joblib avisando que não há manifesto e se a versão do sklearn difere."""
+    print(f"[Aviso] Modelo '{os.path.basename(caminho)}' carregado do .joblib, sem manifesto. "
+          "Converta com: python -m Pacotes.IA.artefatos")
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always")
+        modelo = joblib.load(caminho)
+    # O sklearn avisa uma vez por árvore; basta uma linha por par de versões
+    versoes = set()
+    for aviso in avisos:
+        original = getattr(aviso.message, "original_sklearn_version", None)
+        if original is None:
+            warnings.warn_explicit(aviso.message, aviso.category, aviso.filename, aviso.lineno)
+            continue
+        versoes.add((original, aviso.message.current_sklearn_version))
+    for original, atual in sorted(versoes):
+        print(f"[Aviso] '{os.path.basename(caminho)}' foi salvo com sklearn {original} e está "
+              f"sendo carregado com {atual}: as previsões podem mudar. Re-treine ou converta o modelo.")
+    return modelo
+
+
+class CachePrevisoes:
+    """
+    Envolve um modelo salvo em joblib com um cache LRU de previsões.
+
+    resolucoes aceita tanto o nome exato da feature quanto o prefixo
+    ('MinTemp' vale para MinTemp_dia1..3). Resolução 0 desativa a
+    quantização daquela feature.
+    """
+
+    def __init__(self, caminho_modelo, features, resolucoes=None,
+                 max_itens=1024, caminho_persistencia=None):
+        self.caminho_modelo = caminho_modelo
+        self.features = list(features)
+        self.max_itens = max_itens
+        self.caminho_persistencia = caminho_persistencia
+
+        resolucoes = dict(RESOLUCOES_PADRAO, **(resolucoes or {}))
+        self._passos = np.array(
+            [resolucoes.get(f, resolucoes.get(f.split('_dia')[0], 0.0)) for f in self.features],
+            dtype=float)
+
+        self._modelo = None
+        self._assinatura = None
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+        if caminho_persistencia:
+            self._carregar_persistido()
+
+    # --------------------
+    # Modelo e invalidação
+    # --------------------
+
+    def _verificar_artefato(self):
+        """Carrega o modelo se ainda não carregado ou se o arquivo mudou desde o último load."""
+        assinatura = _assinatura_arquivo(self.caminho_modelo)  # FileNotFoundError sobe ao chamador
+        if self._modelo is not None and assinatura == self._assinatura:
+            return
+        if self._assinatura is not None and assinatura != self._assinatura:
+            self._itens.clear()
+            self.invalidacoes += 1
+        if os.path.isdir(self.caminho_modelo):
+            self._modelo = carregar_artefato(self.caminho_modelo, self.features)
+        else:
+            self._modelo = _carregar_joblib(self.caminho_modelo)
+        self._assinatura = assinatura
+
+    def _chave(self, linha):
+        valores = np.asarray(linha, dtype=float)
+        quantizados = np.where(self._passos > 0,
+                               np.round(valores / np.where(self._passos > 0, self._passos, 1.0)),
+                               valores)
+        return tuple(quantizados.tolist())
+
+    # --------------------
+    # Previsão
+    # --------------------
+
+    def prever_lote(self, linhas):
+        """
+        Prevê uma lista de linhas (listas na ordem de self.features).
+        Só as linhas que faltam no cache vão para o modelo, num único predict.
+        """
+        self._verificar_artefato()
+        chaves = [self._chave(linha) for linha in linhas]
+        resultados = [None] * len(linhas)
+        pendentes = {}  # chave -> índices das linhas com essa chave
+
+        for i, chave in enumerate(chaves):
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                resultados[i] = self._itens[chave]
+                self.acertos += 1
+            else:
+                pendentes.setdefault(chave, []).append(i)
+                self.falhas += 1
+
+        if pendentes:
+            entrada_df = pd.DataFrame(
+                [linhas[indices[0]] for indices in pendentes.values()], columns=self.features)
+            previsoes = self._modelo.predict(entrada_df)
+            for (chave, indices), previsao in zip(pendentes.items(), previsoes):
+                self._itens[chave] = previsao
+                for i in indices:
+                    resultados[i] = previsao
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+        return resultados
+
+    def modelo(self):
+        """Retorna o modelo carregado (recarregado se o artefato mudou), para uso sem cache."""
+        self._verificar_artefato()
+        return self._modelo
+
+    def prever(self, linha):
+        """Prevê uma única linha; retorna a linha correspondente de model.predict."""
+        return self.prever_lote([linha])[0]
+
+    # --------------------
+    # Estatísticas e persistência
+    # --------------------
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "itens": len(self._itens),
+            "invalidacoes": self.invalidacoes,
+        }
+
+    def limpar(self):
+        self._itens.clear()
+
+    def salvar(self):
+        """Grava o cache em disco junto com a assinatura do artefato que o gerou."""
+        if not self.caminho_persistencia or self._assinatura is None:
+            return
+        tmp = self.caminho_persistencia + ".tmp"
+        joblib.dump({"assinatura": self._assinatura, "passos": self._passos,
+                     "itens": self._itens}, tmp)
+        os.replace(tmp, self.caminho_persistencia)
+
+    def _carregar_persistido(self):
+        try:
+            dados = joblib.load(self.caminho_persistencia)
+            atual = _assinatura_arquivo(self.caminho_modelo)
+        except Exception:  # cache ausente ou corrompido: começa vazio
+            return
+        # Cache de outro artefato ou de outra quantização não vale mais
+        if dados.get("assinatura") != atual or not np.array_equal(dados.get("passos"), self._passos):
+            return
+        self._itens = OrderedDict(dados["itens"])
+        self._assinatura = atual
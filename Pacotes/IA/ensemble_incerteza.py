@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Modo ensemble (Monte Carlo) da decisão de irrigação.
+
+Em vez de decidir com uma única previsão da WeatherAPI, gera centenas de
+cenários perturbando temperatura, umidade relativa, chuva e a leitura de
+umidade do solo segundo distribuições de erro por variável e por dia de
+antecedência. ETo, estresse hídrico e os três modelos são avaliados sobre
+a matriz inteira de cenários de uma vez (um predict por modelo), o que
+mantém o custo viável no Raspberry Pi.
+
+O resultado é a probabilidade de irrigar hoje e a distribuição da lâmina
+(mm) prevista entre os cenários.
+"""
+
+import numpy as np
+import pandas as pd
+
+from Pacotes.IA.modelos import FEATURES_CLASSIFICADOR, FEATURES_IRRIGACAO, FEATURES_UMIDADE
+
+# Desvios dos erros de previsão por dia (hoje, D+1, D+2)
+ERROS_PADRAO = {
+    "temperatura_c": [1.0, 1.5, 2.0],       # erro aditivo, mesmo sorteio para Tmin e Tmax
+    "umidade_relativa": [5.0, 7.5, 10.0],   # pontos percentuais
+    "chuva_log": [0.3, 0.5, 0.7],           # erro multiplicativo (log-normal) sobre a chuva prevista
+    "chuva_surpresa_prob": [0.05, 0.10, 0.15],  # chance de chover sem previsão
+    "chuva_surpresa_mm": 3.0,               # média (exponencial) da chuva não prevista
+    "umidade_solo_pct": 1.0,                # erro do sensor, pontos percentuais
+}
+
+
+# --------------------
+# Cálculos vetorizados (mesmas fórmulas de main.py)
+# --------------------
+
+def calcular_eto_vetorizado(tmax, tmin, rh_max, rh_min, u10, rn, g, z):
+    """Versão em numpy de calcular_eto; aceita arrays de qualquer forma compatível."""
+    tmax, tmin, rh_max, rh_min, u10, rn, g = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (tmax, tmin, rh_max, rh_min, u10, rn, g)))
+
+    rh_min_ajustado = np.maximum(0, np.minimum(rh_min, rh_max - 1))
+
+    u2 = u10 * (4.87 / np.log(67.8 * 10 - 5.42))
+    es_tmax = 0.6108 * np.exp((17.27 * tmax) / (tmax + 237.3))
+    es_tmin = 0.6108 * np.exp((17.27 * tmin) / (tmin + 237.3))
+    es = (es_tmax + es_tmin) / 2
+    ea = ((es_tmax * np.clip(rh_min_ajustado, 0, 100) / 100) +
+          (es_tmin * np.clip(rh_max, 0, 100) / 100)) / 2
+    delta = (4098 * es) / (((tmax + tmin) / 2 + 237.3)**2)
+    patm = 101.3 * (((293 - 0.0065 * z) / 293)**5.26)
+    gamma = 0.665e-3 * patm
+
+    denominador = delta + gamma * (1 + 0.34 * u2)
+    numerador = ((0.408 * delta * (rn - g)) +
+                 (gamma * (900 / ((tmax + tmin) / 2 + 273)) * u2 * (es - ea)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eto = np.where(denominador == 0, 0.0, numerador / denominador)
+    return np.maximum(0, eto)
+
+
+def calcular_estresse_vetorizado(umidades, etos, ponto_alerta=15.0, coef_tol=1.0):
+    """Versão em numpy de calcular_estresse_hidrico (umidades em %)."""
+    umidades = np.asarray(umidades, dtype=float)
+    etos = np.asarray(etos, dtype=float)
+    estresse = np.maximum(0, (ponto_alerta - umidades) * coef_tol * (etos / 10.0))
+    return np.where(umidades <= ponto_alerta, estresse, 0.0)
+
+
+# --------------------
+# Cenários
+# --------------------
+
+def gerar_cenarios(tmax, tmin, rh_max, rh_min, precip, umidade_solo_pct,
+                   n_cenarios=500, erros=None, semente=None):
+    """
+    Sorteia n_cenarios perturbações da previsão de 3 dias.
+    Retorna um dict de arrays (n_cenarios, 3) e a umidade do solo (n_cenarios,).
+    """
+    erros = dict(ERROS_PADRAO, **(erros or {}))
+    rng = np.random.default_rng(semente)
+    forma = (n_cenarios, 3)
+
+    dt = rng.normal(0.0, erros["temperatura_c"], size=forma)
+    drh = rng.normal(0.0, erros["umidade_relativa"], size=forma)
+
+    precip = np.asarray(precip, dtype=float)
+    chuva = precip * np.exp(rng.normal(0.0, erros["chuva_log"], size=forma))
+    surpresa = rng.random(forma) < np.asarray(erros["chuva_surpresa_prob"])
+    chuva = chuva + surpresa * rng.exponential(erros["chuva_surpresa_mm"], size=forma)
+
+    umidade = umidade_solo_pct + rng.normal(0.0, erros["umidade_solo_pct"], size=n_cenarios)
+
+    return {
+        "tmax": np.asarray(tmax, dtype=float) + dt,
+        "tmin": np.asarray(tmin, dtype=float) + dt,
+        "rh_max": np.clip(np.asarray(rh_max, dtype=float) + drh, 0, 100),
+        "rh_min": np.clip(np.asarray(rh_min, dtype=float) + drh, 0, 100),
+        "precip": chuva,
+        "umidade_solo_pct": np.clip(umidade, 0, 100),
+    }
+
+
+def avaliar_cenarios(cenarios, u10, rn, g, altitude,
+                     modelo_umidade, modelo_classificador, modelo_irrigacao):
+    """
+    Avalia todos os cenários em lote: ETo, umidade prevista, estresse,
+    decisão do classificador e lâmina do modelo de irrigação.
+    """
+    tmin, tmax, precip = cenarios["tmin"], cenarios["tmax"], cenarios["precip"]
+    eto = calcular_eto_vetorizado(tmax, tmin, cenarios["rh_max"], cenarios["rh_min"],
+                                  u10, rn, g, altitude)
+    th1_hoje = cenarios["umidade_solo_pct"] / 100.0
+
+    # Modelo de umidade: uma linha por cenário, na ordem de FEATURES_UMIDADE
+    entrada_umidade = np.column_stack([
+        th1_hoje, tmin[:, 1], tmax[:, 1], tmin[:, 2], tmax[:, 2],
+        precip[:, 1], precip[:, 2], eto[:, 1], eto[:, 2]])
+    th1_previsto = np.asarray(modelo_umidade.predict(
+        pd.DataFrame(entrada_umidade, columns=FEATURES_UMIDADE)))
+    th1 = np.column_stack([th1_hoje, th1_previsto[:, 0], th1_previsto[:, 1]])
+
+    estresse = calcular_estresse_vetorizado(th1 * 100.0, eto)
+
+    # Mesma ordem de FEATURES_IRRIGACAO / FEATURES_CLASSIFICADOR
+    entrada_irrigacao = np.column_stack([th1, tmin, tmax, precip, eto])
+    entrada_classificador = np.column_stack([entrada_irrigacao, estresse])
+
+    irrigar = np.asarray(modelo_classificador.predict(
+        pd.DataFrame(entrada_classificador, columns=FEATURES_CLASSIFICADOR))).astype(int) == 1
+    lamina = np.asarray(modelo_irrigacao.predict(
+        pd.DataFrame(entrada_irrigacao, columns=FEATURES_IRRIGACAO)), dtype=float)
+    lamina = np.where(irrigar, np.maximum(lamina, 0.0), 0.0)
+
+    return {"irrigar": irrigar, "lamina_mm": lamina, "eto": eto,
+            "umidade_pct": th1 * 100.0, "estresse": estresse}
+
+
+def resumir_ensemble(resultado, percentis=(10, 50, 90)):
+    """Probabilidade de irrigar e estatísticas da lâmina entre os cenários que irrigam."""
+    irrigar, lamina = resultado["irrigar"], resultado["lamina_mm"]
+    resumo = {"probabilidade_irrigar": float(irrigar.mean()),
+              "n_cenarios": int(irrigar.size)}
+    lamina_irrigando = lamina[irrigar]
+    if lamina_irrigando.size:
+        resumo["lamina_media_mm"] = float(lamina_irrigando.mean())
+        for p, valor in zip(percentis, np.percentile(lamina_irrigando, percentis)):
+            resumo[f"lamina_p{p}_mm"] = float(valor)
+    else:
+        resumo["lamina_media_mm"] = 0.0
+        for p in percentis:
+            resumo[f"lamina_p{p}_mm"] = 0.0
+    return resumo
+
+
+def decisao_ensemble(tmax, tmin, rh_max, rh_min, u10, rn, g, precip, altitude,
+                     umidade_solo_pct, modelo_umidade, modelo_classificador,
+                     modelo_irrigacao, n_cenarios=500, erros=None, semente=None):
+    """Gera os cenários, avalia em lote e devolve (resumo, resultado_por_cenario)."""
+    cenarios = gerar_cenarios(tmax, tmin, rh_max, rh_min, precip, umidade_solo_pct,
+                              n_cenarios, erros, semente)
+    resultado = avaliar_cenarios(cenarios, u10, rn, g, altitude,
+                                 modelo_umidade, modelo_classificador, modelo_irrigacao)
+    return resumir_ensemble(resultado), resultado
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Definições compartilhadas dos três modelos do sistema de irrigação.
+
+Mantém num só lugar a ordem das features, os alvos, o arquivo de treino
+de cada estação e os hiperparâmetros usados pelos scripts de treinamento,
+para que avaliação e produção usem exatamente a mesma configuração.
+"""
+
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+# --- Caminhos ---
+BASE_DIR = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+DADOS_DIR = os.path.join(BASE_DIR, "Dados_de_Treinamento")
+
+ESTACOES = ["Cordoba", "Hyderabad"]
+
+# --- Features (mesma ordem usada em main.py) ---
+FEATURES_UMIDADE = [
+    'th1_dia1', 'MinTemp_dia2', 'MaxTemp_dia2', 'MinTemp_dia3', 'MaxTemp_dia3',
+    'Precipitation_dia2', 'Precipitation_dia3', 'ReferenceET_dia2', 'ReferenceET_dia3'
+]
+
+FEATURES_IRRIGACAO = [
+    'th1_dia1', 'th1_dia2', 'th1_dia3',
+    'MinTemp_dia1', 'MinTemp_dia2', 'MinTemp_dia3',
+    'MaxTemp_dia1', 'MaxTemp_dia2', 'MaxTemp_dia3',
+    'Precipitation_dia1', 'Precipitation_dia2', 'Precipitation_dia3',
+    'ReferenceET_dia1', 'ReferenceET_dia2', 'ReferenceET_dia3'
+]
+
+FEATURES_CLASSIFICADOR = FEATURES_IRRIGACAO + [
+    'Estresse_hidrico_dia1', 'Estresse_hidrico_dia2', 'Estresse_hidrico_dia3'
+]
+
+# --- Especificação de cada modelo ---
+# arquivo: dataset completo (períodos 1 e 2) usado no treino original
+# arquivos_periodo: versões com data, usadas nas divisões temporais
+MODELOS = {
+    "umidade": {
+        "features": FEATURES_UMIDADE,
+        "alvos": ['th1_dia2', 'th1_dia3'],
+        "tipo": "regressao",
+        "arquivo": "ciclos_3dias({estacao})Periodo1-2_SemIrrigacao.csv",
+        "arquivos_periodo": [
+            "ciclos_3dias({estacao})Periodo1.csv",
+            "ciclos_3dias({estacao})Periodo2.csv",
+        ],
+        "params": {"n_estimators": 100, "random_state": 42},
+        "artefato": "modelo_umidade_treinado.joblib",
+    },
+    "irrigacao": {
+        "features": FEATURES_IRRIGACAO,
+        "alvos": ['IrrDia_1'],
+        "tipo": "regressao",
+        "arquivo": "ciclos_3dias({estacao})Irrigacao_periodo1-2.csv",
+        "arquivos_periodo": [
+            "ciclos_3dias({estacao})Irrigacao_periodo1.csv",
+            "ciclos_3dias({estacao})Irrigacao_periodo2.csv",
+        ],
+        "params": {"n_estimators": 150, "random_state": 42},
+        "artefato": "modelo_irrigacao_treinado.joblib",
+    },
+    "classificador": {
+        "features": FEATURES_CLASSIFICADOR,
+        "alvos": ['Deve_Irrigar_Dia1'],
+        "tipo": "classificacao",
+        "arquivo": "ciclos_3dias({estacao})Irrigacao_periodo1-2.csv",
+        "arquivos_periodo": [
+            "ciclos_3dias({estacao})Irrigacao_periodo1.csv",
+            "ciclos_3dias({estacao})Irrigacao_periodo2.csv",
+        ],
+        "params": {"n_estimators": 100, "random_state": 42,
+                   "class_weight": 'balanced'},
+        "artefato": "modelo_classificador_irrigacao.joblib",
+    },
+}
+
+
+def caminho_dados(estacao, arquivo):
+    """Monta o caminho de um CSV de treino a partir do nome da estação."""
+    return os.path.join(DADOS_DIR, estacao,
+                        arquivo.format(estacao=estacao.lower()))
+
+
+def preparar_alvos(df):
+    """Cria a coluna alvo do classificador (IrrDia_1 > 0), como em decisao_irrigacao.py."""
+    if 'IrrDia_1' in df.columns and 'Deve_Irrigar_Dia1' not in df.columns:
+        df['Deve_Irrigar_Dia1'] = np.where(df['IrrDia_1'] > 0, 1, 0)
+    return df
+
+
+def parametros_modelo(nome, **params_extras):
+    """Hiperparâmetros efetivos de um modelo: os padrão mais os extras informados."""
+    return dict(MODELOS[nome]["params"], **params_extras)
+
+
+def criar_estimador(tipo, params):
+    """Instancia a floresta não treinada de um tipo ('regressao'/'classificacao')."""
+    if tipo == "classificacao":
+        return RandomForestClassifier(**params)
+    return RandomForestRegressor(**params)
+
+
+def criar_modelo(nome, **params_extras):
+    """Instancia o estimador não treinado de um modelo com os hiperparâmetros padrão."""
+    return criar_estimador(MODELOS[nome]["tipo"], parametros_modelo(nome, **params_extras))
@@ -2,29 +2,47 @@
 # -*- coding: utf-8 -*-
 
 import requests
-import pandas as pd
-import joblib
 import math
 import serial
 import time
 import os
-import warnings
 import paho.mqtt.client as mqtt 
 import uuid
-# Suprime aviso de unpickle de versão do sklearn
-warnings.filterwarnings(
-    "ignore",
-    message=".*Trying to unpickle estimator .* from version .* when using version .*"
-)
+
+from Atuadores.Agendador_bombas import agendar_irrigacao, executar_plano, imprimir_plano
+from Pacotes.IA.artefatos import caminho_artefato
+from Pacotes.IA.atualizacao_incremental import registrar_ciclo
+from Pacotes.IA.cache_previsoes import CachePrevisoes
+from Pacotes.IA.ensemble_incerteza import decisao_ensemble
+from Pacotes.IA.modelos import FEATURES_CLASSIFICADOR, FEATURES_IRRIGACAO, FEATURES_UMIDADE
 
 
 # --- Configurações de caminhos absolutos ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_TH_PATH = os.path.join(BASE_DIR, "modelo_umidade_treinado.joblib")
-MODEL_IRR_PATH = os.path.join(BASE_DIR, "modelo_irrigacao_treinado.joblib")
+
+
+def caminho_modelo(nome_joblib):
+    # Prefere o artefato mapeável com manifesto (diretório .modelo) quando existir
+    caminho = os.path.join(BASE_DIR, nome_joblib)
+    artefato = caminho_artefato(caminho)
+    return artefato if os.path.isdir(artefato) else caminho
+
+
+MODEL_TH_PATH = caminho_modelo("modelo_umidade_treinado.joblib")
+MODEL_IRR_PATH = caminho_modelo("modelo_irrigacao_treinado.joblib")
 # Caminho para o novo modelo classificador
-MODEL_CLASS_PATH = os.path.join(
-    BASE_DIR, "modelo_classificador_irrigacao.joblib")
+MODEL_CLASS_PATH = caminho_modelo("modelo_classificador_irrigacao.joblib")
+
+# --- Cache de previsões (features quantizadas, invalidado quando o artefato muda) ---
+CACHE_UMIDADE = CachePrevisoes(
+    MODEL_TH_PATH, FEATURES_UMIDADE,
+    caminho_persistencia=os.path.join(BASE_DIR, "cache_previsoes_umidade.joblib"))
+CACHE_CLASSIFICADOR = CachePrevisoes(
+    MODEL_CLASS_PATH, FEATURES_CLASSIFICADOR,
+    caminho_persistencia=os.path.join(BASE_DIR, "cache_previsoes_classificador.joblib"))
+CACHE_IRRIGACAO = CachePrevisoes(
+    MODEL_IRR_PATH, FEATURES_IRRIGACAO,
+    caminho_persistencia=os.path.join(BASE_DIR, "cache_previsoes_irrigacao.joblib"))
 
 # --------------------
 # Funções de hardware
@@ -194,18 +212,11 @@ def calcular_estresse_hidrico(umidades, etos, ponto_alerta=15.0, coef_tol=1.0):
 
 
 def previsao_umidade_solo(entrada_umidade_list):
-    # Colunas esperadas pelo modelo de umidade do solo
-    features_umidade = [
-        'th1_dia1', 'MinTemp_dia2', 'MaxTemp_dia2', 'MinTemp_dia3', 'MaxTemp_dia3',
-        'Precipitation_dia2', 'Precipitation_dia3', 'ReferenceET_dia2', 'ReferenceET_dia3'
-    ]
+    # Colunas esperadas pelo modelo de umidade do solo: FEATURES_UMIDADE
     try:
-        modelo_umidade = joblib.load(MODEL_TH_PATH)
-        entrada_df = pd.DataFrame(
-            [entrada_umidade_list], columns=features_umidade)
-        previsao = modelo_umidade.predict(entrada_df)
-        # A previsão pode ser uma lista de listas ou array 2D, pegamos o primeiro elemento
-        return [float(x) for x in previsao[0]]
+        previsao = CACHE_UMIDADE.prever(entrada_umidade_list)
+        # Linha da saída 2D do modelo: [th1_dia2, th1_dia3]
+        return [float(x) for x in previsao]
     except FileNotFoundError:
         print(
             f"[Erro Critico] Arquivo do modelo de umidade não encontrado: {MODEL_TH_PATH}")
@@ -216,22 +227,11 @@ def previsao_umidade_solo(entrada_umidade_list):
 
 
 def deve_irrigar_hoje(entrada_classificador_list):
-    
-    features_classificador = [
-        'th1_dia1', 'th1_dia2', 'th1_dia3',
-        'MinTemp_dia1', 'MinTemp_dia2', 'MinTemp_dia3',
-        'MaxTemp_dia1', 'MaxTemp_dia2', 'MaxTemp_dia3',
-        'Precipitation_dia1', 'Precipitation_dia2', 'Precipitation_dia3',
-        'ReferenceET_dia1', 'ReferenceET_dia2', 'ReferenceET_dia3',
-        'Estresse_hidrico_dia1', 'Estresse_hidrico_dia2', 'Estresse_hidrico_dia3'
-    ]
+    # Colunas esperadas pelo classificador: FEATURES_CLASSIFICADOR
     try:
-        modelo_classificador = joblib.load(MODEL_CLASS_PATH)
-        entrada_df = pd.DataFrame(
-            [entrada_classificador_list], columns=features_classificador)
-        predicao_classe = modelo_classificador.predict(entrada_df)
+        predicao_classe = CACHE_CLASSIFICADOR.prever(entrada_classificador_list)
         # Retorna True se a classe prevista for 1, False caso contrário.
-        return int(predicao_classe[0]) == 1
+        return int(predicao_classe) == 1
     except FileNotFoundError:
         print(
             f"[Erro Critico] Arquivo do modelo classificador não encontrado: {MODEL_CLASS_PATH}")
@@ -242,20 +242,10 @@ def deve_irrigar_hoje(entrada_classificador_list):
 
 
 def previsao_irrigacao(entrada_irrigacao_list):
-    # Colunas esperadas pelo modelo de previsão de irrigação (regressão)
-    features_irrigacao = [
-        'th1_dia1', 'th1_dia2', 'th1_dia3',
-        'MinTemp_dia1', 'MinTemp_dia2', 'MinTemp_dia3',
-        'MaxTemp_dia1', 'MaxTemp_dia2', 'MaxTemp_dia3',
-        'Precipitation_dia1', 'Precipitation_dia2', 'Precipitation_dia3',
-        'ReferenceET_dia1', 'ReferenceET_dia2', 'ReferenceET_dia3'
-    ]
+    # Colunas esperadas pelo modelo de previsão de irrigação (regressão): FEATURES_IRRIGACAO
     try:
-        modelo_irrigacao = joblib.load(MODEL_IRR_PATH)
-        entrada_df = pd.DataFrame(
-            [entrada_irrigacao_list], columns=features_irrigacao)
-        predicao_qtde = modelo_irrigacao.predict(entrada_df)
-        return float(predicao_qtde[0])
+        predicao_qtde = CACHE_IRRIGACAO.prever(entrada_irrigacao_list)
+        return float(predicao_qtde)
     except FileNotFoundError:
         print(
             f"[Erro Critico] Arquivo do modelo de irrigação não encontrado: {MODEL_IRR_PATH}")
@@ -282,6 +272,7 @@ if __name__ == "__main__":
     MQTT_TOPIC_IRRIGATION_DECISION_TODAY = "projeto/irrigacao/decisao_irrigar_hoje" # "Sim" ou "Não"
     MQTT_TOPIC_IRRIGATION_AMOUNT_TODAY = "projeto/irrigacao/qtde_irrigada_hoje_mm"
     MQTT_TOPIC_IRRIGATION_DURATION_TODAY = "projeto/irrigacao/duracao_bomba_hoje_s"
+    MQTT_TOPIC_IRRIGATION_PROBABILITY_TODAY = "projeto/irrigacao/prob_irrigar_hoje" # só no modo ensemble
 
     mqtt_client = None # Inicializa como None
     try:
@@ -300,6 +291,16 @@ if __name__ == "__main__":
     AREA_M2   = 1           # Área da plantação em m²
     VAZAO_LPH = 1200        # Vazão da bomba em Litros por Hora
     PORTA_ARDUINO = '/dev/ttyACM0' # Ajuste para sua porta real
+    # Modo ensemble: decide pela probabilidade entre cenários perturbados da previsão
+    MODO_ENSEMBLE = False
+    N_CENARIOS = 500
+    LIMIAR_PROB_IRRIGAR = 0.5
+    # Linha de abastecimento compartilhada pelas bombas
+    VAZAO_MAX_LINHA_LPH = 1200      # Vazão máxima somada das bombas ligadas ao mesmo tempo
+    VOLUME_TANQUE_L = None          # Volume disponível no tanque (None = sem limite)
+    # Ex.: [(21, 6)] para irrigar só entre 21h e 6h; vazio = sem restrição. O cron deve rodar
+    # main.py dentro da janela: fora dela (ou se a rega não terminar antes do fim) as zonas ficam adiadas
+    JANELAS_FORA_PICO = []
 
     # Inicializar variáveis que serão publicadas via MQTT para garantir que sempre existam
     umidade_para_mqtt = 0.0
@@ -307,6 +308,7 @@ if __name__ == "__main__":
     decisao_irrigar_str_para_mqtt = "Não"
     final_qtde_irrigada_mm = 0.0
     final_duracao_bomba_s = 0
+    prob_irrigar_para_mqtt = None
 
     # 1) Obter dados meteorológicos
     print("\n1. Obtendo dados meteorológicos...")
@@ -337,7 +339,10 @@ if __name__ == "__main__":
 
     # 4) Ler umidade atual do solo
     print("4. Lendo umidade atual do solo...")
-    umidade_atual_solo_percent = ler_umidade_solo(porta=PORTA_ARDUINO, default=30.0)
+    leitura_sensor = ler_umidade_solo(porta=PORTA_ARDUINO, default=None)
+    # Em caso de falha segue com 30 %, mas o ciclo não entra no log de features
+    leitura_sensor_valida = leitura_sensor is not None
+    umidade_atual_solo_percent = leitura_sensor if leitura_sensor_valida else 30.0
     umidade_para_mqtt = umidade_atual_solo_percent # Salva para MQTT
     print(f"   Umidade atual do solo: {umidade_atual_solo_percent:.1f}%")
 
@@ -380,7 +385,24 @@ if __name__ == "__main__":
         precip_list[0], precip_list[1], precip_list[2], eto_list[0], eto_list[1], eto_list[2],
         estresse_hidrico_3dias[0], estresse_hidrico_3dias[1], estresse_hidrico_3dias[2]
     ]
+    quantidade_ensemble_mm = None
     irrigacao_necessaria_hoje = deve_irrigar_hoje(entrada_classificador_list)
+    if MODO_ENSEMBLE:
+        try:
+            resumo_ensemble, _ = decisao_ensemble(
+                tmax_list, tmin_list, rh_max_list, rh_min_list, u10_list, rn_list, g_list,
+                precip_list, ALTITUDE, umidade_atual_solo_percent,
+                CACHE_UMIDADE.modelo(), CACHE_CLASSIFICADOR.modelo(), CACHE_IRRIGACAO.modelo(),
+                n_cenarios=N_CENARIOS)
+            prob_irrigar_para_mqtt = resumo_ensemble["probabilidade_irrigar"]
+            print(f"   Ensemble ({resumo_ensemble['n_cenarios']} cenários): "
+                  f"P(irrigar) = {prob_irrigar_para_mqtt:.0%}, lâmina p10/p50/p90 = "
+                  f"{resumo_ensemble['lamina_p10_mm']:.2f}/{resumo_ensemble['lamina_p50_mm']:.2f}/"
+                  f"{resumo_ensemble['lamina_p90_mm']:.2f} mm")
+            irrigacao_necessaria_hoje = prob_irrigar_para_mqtt >= LIMIAR_PROB_IRRIGAR
+            quantidade_ensemble_mm = resumo_ensemble["lamina_p50_mm"]
+        except Exception as e:
+            print(f"[Aviso] Falha no modo ensemble: {e}. Usando a previsão pontual.")
     decisao_irrigar_str_para_mqtt = "Sim" if irrigacao_necessaria_hoje else "Não" # Salva para MQTT
     print(f"   Decisão do classificador: {'IRRIGAR HOJE' if irrigacao_necessaria_hoje else 'NÃO IRRIGAR HOJE'}")
 
@@ -392,24 +414,49 @@ if __name__ == "__main__":
             tmin_list[0], tmin_list[1], tmin_list[2], tmax_list[0], tmax_list[1], tmax_list[2],
             precip_list[0], precip_list[1], precip_list[2], eto_list[0], eto_list[1], eto_list[2]
         ]
-        quantidade_irrigar_mm = previsao_irrigacao(entrada_previsao_irrigacao)
+        if quantidade_ensemble_mm is not None:
+            # Mediana da lâmina entre os cenários em que o classificador mandou irrigar
+            quantidade_irrigar_mm = quantidade_ensemble_mm
+        else:
+            quantidade_irrigar_mm = previsao_irrigacao(entrada_previsao_irrigacao)
         
         if quantidade_irrigar_mm > 0:
-            final_qtde_irrigada_mm = quantidade_irrigar_mm # Salva para MQTT
-            print(f"   Quantidade de irrigação prevista para hoje: {final_qtde_irrigada_mm:.2f} mm")
-            print("9. Acionando bomba de irrigação...")
-            litros_gastos, dur_s, ack_bomba = acionar_bomba_irrigacao(
-                quantidade_agua_mm=final_qtde_irrigada_mm,
-                area_m2=AREA_M2,
-                vazao_bomba_lph=VAZAO_LPH,
-                porta=PORTA_ARDUINO
-            )
-            final_duracao_bomba_s = dur_s # Salva para MQTT
+            print(f"   Quantidade de irrigação prevista para hoje: {quantidade_irrigar_mm:.2f} mm")
+            print("9. Agendando e acionando bomba de irrigação...")
+            zonas = [{"nome": "1", "quantidade_mm": quantidade_irrigar_mm,
+                      "area_m2": AREA_M2, "vazao_lph": VAZAO_LPH, "porta": PORTA_ARDUINO}]
+            plano = agendar_irrigacao(zonas, VAZAO_MAX_LINHA_LPH, VOLUME_TANQUE_L, JANELAS_FORA_PICO)
+            imprimir_plano(plano)
+            resultados_bombas = executar_plano(plano, lambda zona: acionar_bomba_irrigacao(
+                quantidade_agua_mm=zona["quantidade_mm"],
+                area_m2=zona["area_m2"],
+                vazao_bomba_lph=zona["vazao_lph"],
+                porta=zona["porta"]
+            ))
+            # Só conta como irrigado o que o Arduino confirmou ("OK"); zonas adiadas
+            # ou com falha na serial ficam com 0 no MQTT e no log de features
+            for zona in plano['execucoes']:
+                resultado = resultados_bombas.get(zona['nome'])
+                if resultado is not None and resultado[2] == "OK":
+                    final_qtde_irrigada_mm += zona['quantidade_mm']  # Salva para MQTT
+                    final_duracao_bomba_s += resultado[1]  # Salva para MQTT
+                else:
+                    print(f"   [Aviso] Zona {zona['nome']}: bomba sem confirmação. Irrigação não contabilizada.")
+            for zona in plano['adiadas']:
+                print(f"   Zona {zona['nome']} não irrigada hoje ({zona['motivo']}).")
+            print(f"   Quantidade efetivamente irrigada hoje: {final_qtde_irrigada_mm:.2f} mm")
         else:
             print(f"   Modelo de irrigação previu {quantidade_irrigar_mm:.2f} mm. Nenhuma irrigação será realizada.")
     else:
         print("8. Irrigação não é necessária hoje conforme o classificador. Nenhuma ação de irrigação será tomada.")
 
+    # Registra o ciclo no log de features para a atualização incremental do modelo de umidade
+    try:
+        registrar_ciclo(entrada_classificador_list, final_qtde_irrigada_mm,
+                        leitura_valida=leitura_sensor_valida)
+    except Exception as e:
+        print(f"[Aviso] Falha ao registrar o ciclo no log de features: {e}")
+
     # --- Publicar dados via MQTT ---
     if mqtt_client and mqtt_client.is_connected(): # Verifica se o cliente existe e está conectado
         print("\n10. Publicando dados via MQTT...")
@@ -420,6 +467,8 @@ if __name__ == "__main__":
             mqtt_client.publish(MQTT_TOPIC_IRRIGATION_DECISION_TODAY, payload=decisao_irrigar_str_para_mqtt, qos=1, retain=True)
             mqtt_client.publish(MQTT_TOPIC_IRRIGATION_AMOUNT_TODAY, payload=f"{final_qtde_irrigada_mm:.2f}", qos=1, retain=True)
             mqtt_client.publish(MQTT_TOPIC_IRRIGATION_DURATION_TODAY, payload=str(final_duracao_bomba_s), qos=1, retain=True) # Envia como string
+            if prob_irrigar_para_mqtt is not None:
+                mqtt_client.publish(MQTT_TOPIC_IRRIGATION_PROBABILITY_TODAY, payload=f"{prob_irrigar_para_mqtt:.2f}", qos=1, retain=True)
             
             print(f"   Dados publicados nos tópicos '{MQTT_TOPIC_SOIL_MOISTURE}', '{MQTT_TOPIC_WATER_STRESS_TODAY}', etc.")
         except Exception as e:
@@ -428,6 +477,17 @@ if __name__ == "__main__":
         print("\n10. Não foi possível publicar dados via MQTT (cliente não conectado).")
 
 
+    # --- Cache de previsões ---
+    for nome_cache, cache in (("umidade", CACHE_UMIDADE), ("classificador", CACHE_CLASSIFICADOR),
+                              ("irrigação", CACHE_IRRIGACAO)):
+        est = cache.estatisticas()
+        print(f"Cache {nome_cache}: {est['acertos']} acertos, {est['falhas']} falhas "
+              f"({est['taxa_acerto']:.0%}), {est['itens']} itens")
+        try:
+            cache.salvar()
+        except Exception as e:
+            print(f"[Aviso] Falha ao salvar cache de previsões ({nome_cache}): {e}")
+
     print("\n--- Sistema Autônomo de Irrigação Concluído ---")
 
     # --- Desconectar do MQTT Broker ---
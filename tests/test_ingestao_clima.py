@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+A ingestão em blocos deve dar o mesmo resultado qualquer que seja o
+tamanho do bloco, inclusive com falhas que cruzam a fronteira entre blocos.
+
+Uso (a partir da raiz do projeto):
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pacotes.Dados.ingestao_clima import (etapa_eto, janelas_3dias, ler_clima_em_blocos,
+                                          ler_estacoes_em_blocos, validar_e_preencher)
+
+ARQUIVO_CORDOBA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "Dados_de_Treinamento", "Cordoba", "cordoba_climate.txt")
+LATITUDE_CORDOBA = -31.4
+TAMANHOS_BLOCO = [7, 499, 500, 1000]
+
+
+@pytest.fixture
+def arquivo_com_falhas(tmp_path):
+    """Primeiros 1500 dias de Cordoba com falhas curtas, longas e dias removidos."""
+    df = pd.read_csv(ARQUIVO_CORDOBA, sep='\t', nrows=1500)
+    df.loc[497:503, 'Et0(mm)'] = np.nan        # 7 dias na fronteira de 500: não preenche
+    df.loc[996:999, 'Et0(mm)'] = np.nan        # 4 dias na fronteira de 1000: preenche
+    df.loc[698:701, 'Tmax(C)'] = np.nan        # 4 dias na fronteira de 700 (bloco 7)
+    df.loc[800:812, 'Tmin(C)'] = np.nan        # 13 dias: descartados
+    df.loc[1200, 'Tmax(C)'] = 99.0             # fora da faixa física
+    df = df.drop(index=range(1100, 1103))      # 3 dias ausentes do arquivo
+    caminho = tmp_path / "clima.txt"
+    df.to_csv(caminho, sep='\t', index=False)
+    return str(caminho)
+
+
+def _preenchido(caminho, tamanho_bloco):
+    blocos = validar_e_preencher(ler_clima_em_blocos(caminho, tamanho_bloco))
+    return pd.concat(list(blocos), ignore_index=True)
+
+
+def _janelas(caminho, tamanho_bloco):
+    blocos = etapa_eto(validar_e_preencher(ler_clima_em_blocos(caminho, tamanho_bloco)),
+                       LATITUDE_CORDOBA)
+    return pd.concat(list(janelas_3dias(blocos)), ignore_index=True)
+
+
+@pytest.mark.parametrize("tamanho_bloco", TAMANHOS_BLOCO)
+def test_resultado_independe_do_tamanho_do_bloco(arquivo_com_falhas, tamanho_bloco):
+    arquivo_inteiro = 10_000
+    pd.testing.assert_frame_equal(_preenchido(arquivo_com_falhas, tamanho_bloco),
+                                  _preenchido(arquivo_com_falhas, arquivo_inteiro))
+    pd.testing.assert_frame_equal(_janelas(arquivo_com_falhas, tamanho_bloco),
+                                  _janelas(arquivo_com_falhas, arquivo_inteiro))
+
+
+def test_so_falhas_curtas_sao_preenchidas(arquivo_com_falhas):
+    df = _preenchido(arquivo_com_falhas, 500).set_index('data')
+    datas = pd.date_range("1991-01-01", periods=1500, freq='D')
+
+    # Falha longa de ReferenceET fica inteira em NaN (nada de preencher só as pontas)
+    assert df.loc[datas[497]:datas[503], 'ReferenceET'].isna().all()
+    # Falhas curtas são interpoladas, inclusive o valor fora da faixa e os dias ausentes
+    assert df.loc[datas[996]:datas[999], 'ReferenceET'].notna().all()
+    assert df.loc[datas[698]:datas[701], 'MaxTemp'].notna().all()
+    assert df.loc[datas[1200], 'MaxTemp'] < 60
+    assert df.loc[datas[1100]:datas[1102], 'preenchido'].all()
+    # Falha longa de temperatura: os 13 dias saem do dataset
+    assert not df.index.isin(datas[800:813]).any()
+    assert len(df) == 1500 - 13
+
+
+def test_janelas_sem_referenceet_ausente_nas_falhas_curtas(arquivo_com_falhas):
+    janelas = _janelas(arquivo_com_falhas, 499)
+    colunas_eto = [f'ReferenceET_dia{i}' for i in (1, 2, 3)]
+    assert janelas[colunas_eto].notna().all().all()
+
+
+@pytest.fixture
+def estacoes_sem_eto(tmp_path):
+    """Duas estações com o mesmo clima, sem a coluna de ETo."""
+    df = pd.read_csv(ARQUIVO_CORDOBA, sep='\t', nrows=400).drop(columns=['Et0(mm)'])
+    arquivos = {}
+    for estacao in ("Norte", "Sul"):
+        arquivos[estacao] = str(tmp_path / f"{estacao}.txt")
+        df.to_csv(arquivos[estacao], sep='\t', index=False)
+    return arquivos
+
+
+def _eto_por_estacao(arquivos, latitudes):
+    blocos = etapa_eto(validar_e_preencher(ler_estacoes_em_blocos(arquivos, 150)), latitudes)
+    df = pd.concat(list(blocos), ignore_index=True)
+    return {estacao: grupo['ReferenceET'].to_numpy() for estacao, grupo in df.groupby('estacao')}
+
+
+def test_eto_usa_a_latitude_de_cada_estacao(estacoes_sem_eto):
+    latitudes = {"Norte": 17.4, "Sul": LATITUDE_CORDOBA}
+    por_dict = _eto_por_estacao(estacoes_sem_eto, latitudes)
+    por_funcao = _eto_por_estacao(estacoes_sem_eto, latitudes.get)
+    for estacao, latitude in latitudes.items():
+        sozinha = _eto_por_estacao({estacao: estacoes_sem_eto[estacao]}, latitude)[estacao]
+        np.testing.assert_array_equal(por_dict[estacao], sozinha)
+        np.testing.assert_array_equal(por_funcao[estacao], sozinha)
+    assert not np.allclose(por_dict["Norte"], por_dict["Sul"])
+
+
+def test_eto_sem_latitude_da_estacao_levanta_erro(estacoes_sem_eto):
+    with pytest.raises(ValueError, match="Sul"):
+        _eto_por_estacao(estacoes_sem_eto, {"Norte": 17.4})